@@ -1,25 +1,109 @@
 """A Pyzotero Wrapper class and Parser class for the different type of Zotero items."""
 
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Callable, Iterable, Iterator
 from abc import ABC, abstractmethod
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import atexit
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import threading
 
 from pyzotero import zotero
-from bs4 import BeautifulSoup, Tag
-import fitz
+import httpx
+from lxml import etree, html as lxml_html
+import orjson
 
 from .log import logger
 
+# Cached PDF texts beyond this number are deleted, least recently used first
+PDF_TEXT_CACHE_MAX_FILES = 1000
+# Maximum number of keys the Zotero API accepts in a single itemKey/collectionKey request
+MAX_KEYS_PER_REQUEST = 50
+# Keep-alive pool of the HTTP client, shared by all requests of a PyzoteroClient
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+HTTP_CONNECT_RETRIES = 3
+# Threads parsing found items concurrently, each one talks to Zotero through its own client
+METADATA_MAX_WORKERS = 8
+
+# Matches the common note layout where the h1 title is the first element of the note div
+_NOTE_LEADING_H1_RE = re.compile(r'\s*<div\b[^>]*\bdata-schema-version="9"[^>]*>\s*<h1\b[^>]*>(.*?)</h1\s*>',
+                                 re.DOTALL | re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+# Compiled once, the lxml XPath evaluator is reused for every note
+_NOTE_DIV_XPATH = etree.XPath('//div[@data-schema-version="9"]')
+# Error messages of the type assertions, formatted with the type of the rejected instance
+_LIST_TYPE_ERROR = f"The found items need to be a of type: {list} but it is of type: {{}}"
+_DICT_TYPE_ERROR = f"The found item need to be a of type {dict}, but is of type: {{}}."
+# lxml parsers must not be shared between threads, so each thread keeps its own note parser
+_note_html_parsers = threading.local()
+
+
+class _OrjsonResponse(httpx.Response):
+    """HTTP response which decodes its JSON body with orjson."""
+
+    def json(self, **kwargs: Any) -> Any:
+        """Decodes the JSON body, keyword arguments are only supported by the json module."""
+        if kwargs:
+            return super().json(**kwargs)
+        return orjson.loads(self.content) # pylint: disable=no-member
+
+class _OrjsonHTTPTransport(httpx.HTTPTransport):
+    """HTTP transport whose responses decode JSON with orjson, pyzotero decodes all responses via json()."""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Sends the request and wraps the response in an _OrjsonResponse."""
+        response = super().handle_request(request)
+        return _OrjsonResponse(status_code=response.status_code,
+                               headers=response.headers,
+                               stream=response.stream,
+                               extensions=response.extensions)
 
 class PyzoteroClient(zotero.Zotero):
     """Wrapper around Zotero class."""
 
-    def __init__(self, library_id, library_type, local=True):
-        """Initialize the Pyzotero client."""
+    def __init__(self, library_id, library_type, local=True, http_client: httpx.Client | None = None):
+        """Initialize the Pyzotero client, optionally on the HTTP client of another PyzoteroClient."""
 
         super().__init__(library_id=library_id,
                             library_type=library_type,
                             local=local)
+        self._client_args = (library_id, library_type, local)
+        self._owner_thread_id = threading.get_ident()
+        self._thread_clients = threading.local()
+        # Replace the default pyzotero HTTP client by one with an explicit connection pool,
+        # so every request reuses a kept-alive connection and failed connects are retried
+        self.client.close() # type: ignore
+        self._shares_http_client = http_client is not None
+        self.client = http_client or httpx.Client(headers=self.default_headers(),
+                                                  follow_redirects=True,
+                                                  transport=_OrjsonHTTPTransport(limits=HTTP_POOL_LIMITS,
+                                                                                 retries=HTTP_CONNECT_RETRIES))
+
+    def __del__(self):
+        """Closes the HTTP client, unless it belongs to the client this worker client was created by."""
+        if not getattr(self, "_shares_http_client", False):
+            super().__del__()
+
+    def worker_client(self) -> "PyzoteroClient":
+        """Returns a client for the calling thread.
+
+        Pyzotero keeps the parameters and response of the current request on the client,
+        so other threads than the owner get their own client with the same library settings.
+        The thread-safe HTTP client and its connection pool are shared with the owner.
+        """
+
+        if threading.get_ident() == self._owner_thread_id:
+            return self
+        thread_client = getattr(self._thread_clients, "client", None)
+        if thread_client is None:
+            thread_client = type(self)(*self._client_args, http_client=self.client) # type: ignore
+            self._thread_clients.client = thread_client
+        return thread_client
 
     def query_library(self, limit: int, query: str) -> List:
         """Query the zotero library via query string."""
@@ -33,11 +117,35 @@ class PyzoteroClient(zotero.Zotero):
         return found_items
 
     def retrieve_items(self, item_keys: List) -> List:
-        """Retrieve one or more items via key from zotero library."""        
+        """Retrieve one or more items via key from zotero library, in the order of the keys."""
         _assert_list(item_keys)
-        retrieved_items = [self.item(str(item_key)) for item_key in item_keys] # type: ignore
+        item_keys = [str(item_key) for item_key in item_keys]
+        items_by_key = self.get_items_by_keys(set(item_keys))
+        # Keys the bulk request did not return are requested one by one, which raises for unknown keys
+        retrieved_items = [items_by_key[item_key] if item_key in items_by_key else self.item(item_key) # type: ignore
+                           for item_key in item_keys]
         return retrieved_items
 
+    def get_items_by_keys(self, item_keys: Iterable[str]) -> Dict[str, Dict]:
+        """Retrieve many items with as few requests as possible via the itemKey parameter, indexed by key."""
+        return self._fetch_by_keys(self.items, "itemKey", item_keys)
+
+    def get_collections_by_keys(self, collection_keys: Iterable[str]) -> Dict[str, Dict]:
+        """Retrieve many collections with as few requests as possible via the collectionKey parameter, by key."""
+        return self._fetch_by_keys(self.collections, "collectionKey", collection_keys)
+
+    @staticmethod
+    def _fetch_by_keys(fetch: Callable, key_parameter: str, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Calls fetch once per chunk of MAX_KEYS_PER_REQUEST keys and indexes the results by key."""
+        keys = list(keys)
+        fetched: Dict[str, Dict] = {}
+        for start in range(0, len(keys), MAX_KEYS_PER_REQUEST):
+            keys_chunk = keys[start:start + MAX_KEYS_PER_REQUEST]
+            fetched_chunk = fetch(**{key_parameter: ",".join(keys_chunk), "limit": len(keys_chunk)})
+            _assert_list(fetched_chunk)
+            fetched.update((fetched_item["key"], fetched_item) for fetched_item in fetched_chunk)
+        return fetched
+
 class PyzoteroParsingStrategy(ABC):
     """Abstract pyzoter parsing class, template for parsers for specific item types."""
 
@@ -59,24 +167,29 @@ class NotePyzoteroParsingStrategy(PyzoteroParsingStrategy):
         """Parse the title of a note item from note field."""
 
         note_html = item_data.get("note")
-        parsed_html = BeautifulSoup(note_html, "html.parser") # type: ignore
-        note_div = parsed_html.find("div", {"data-schema-version": "9"})
-        _assert_tag(note_div)
-
-        note_title = None
-        for child_element in note_div.contents: # type: ignore
-            # Check if the child is a Tag and is an h1
-            if isinstance(child_element, Tag):
-                if child_element.name == "h1":
-                    note_title = child_element.get_text()
-                    logger.info("Found note title: %s", note_title)
-                    break
-
-        if note_title is None:
-            note_title = note_div.contents[0].get_text() # type: ignore
-            logger.info("Found no note title inside h1 tag, therefore took first element: %s", note_title)
-
         item_parent_title = item_parent_data.get("title") # type: ignore
+
+        # Fast path without building a tree, strip the inner tags and decode entities like text_content does
+        note_h1_match = _NOTE_LEADING_H1_RE.match(note_html) # type: ignore
+        if note_h1_match:
+            note_title = html.unescape(_HTML_TAG_RE.sub("", note_h1_match.group(1)))
+            logger.debug("Found note title: %s", note_title)
+            return note_title, item_parent_title
+
+        note_divs = _NOTE_DIV_XPATH(lxml_html.document_fromstring(note_html, parser=_get_note_html_parser()))
+        note_div = note_divs[0] if note_divs else None # type: ignore
+        _assert_html_element(note_div)
+
+        # Only direct children of the note div count as the note title
+        note_h1 = note_div.find("h1") # type: ignore
+        if note_h1 is not None:
+            note_title = note_h1.text_content()
+            logger.debug("Found note title: %s", note_title)
+        else:
+            # The first node of the div is either its leading text or its first child element
+            note_title = note_div.text if note_div.text is not None else note_div[0].text_content() # type: ignore
+            logger.debug("Found no note title inside h1 tag, therefore took first element: %s", note_title)
+
         return note_title, item_parent_title
 
     def parse_content(self, item_data: Dict) -> Dict:
@@ -99,63 +212,158 @@ class ItemPyzoteroParsingStrategy(PyzoteroParsingStrategy):
 class PDFAttachmentPyzoteroParsingStrategy(ItemPyzoteroParsingStrategy):
     """Parser for zotero items which are pdf attachments."""
 
-    def __init__(self, pyzotero_client: PyzoteroClient):
-        """Initialize the PDF parser with the Pyzotero client."""
+    def __init__(self, pyzotero_client: PyzoteroClient, cache_dir: Path | None = None,
+                 text_max_chars: int | None = None):
+        """Initialize the PDF parser with the Pyzotero client, an optional directory for cached texts
+        and an optional maximum number of characters returned per PDF."""
         self.pyzotero_client = pyzotero_client
+        self.text_cache_dir = cache_dir / "pdf_text" if cache_dir else None
+        self.text_max_chars = text_max_chars
 
     def parse_content(self, item_data: Dict)  -> str:
-        """Parse the text content of a PDF attachment."""        
+        """Parse the text content of a PDF attachment, cut to text_max_chars if set."""
 
-        pdf_bytes_io = BytesIO(self.pyzotero_client.file(item_data.get("key"))) #type: ignore
-        pdf_text =""
+        pdf_text = self._get_text(item_data)
+        if self.text_max_chars is not None and len(pdf_text) > self.text_max_chars:
+            logger.info("Cut text of PDF %s from %d to %d characters",
+                        item_data.get("key"), len(pdf_text), self.text_max_chars)
+            pdf_text = pdf_text[:self.text_max_chars]
+        return pdf_text
 
-        with fitz.open(stream=pdf_bytes_io, filetype="pdf") as pdf_document:
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                pdf_text += page.get_text("text") #type: ignore
+    def _get_text(self, item_data: Dict) -> str:
+        """Returns the full text of a PDF attachment, from the text cache if it was extracted before."""
+
+        text_cache_path = self._get_text_cache_path(item_data)
+        if text_cache_path:
+            try:
+                pdf_text_bytes = text_cache_path.read_bytes()
+                # The modification time marks the last use for the eviction
+                text_cache_path.touch()
+                logger.debug("Read cached PDF text: %s", text_cache_path)
+                return gzip.decompress(pdf_text_bytes).decode("utf-8")
+            except FileNotFoundError:
+                pass
+
+        pdf_text = self._extract_text(item_data)
+
+        if text_cache_path:
+            try:
+                text_cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a temporary file first, so a crash never leaves a truncated cache entry
+                # Named per process and thread, items may be retrieved by several tool calls at once
+                text_cache_tmp_path = text_cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                text_cache_tmp_path.write_bytes(gzip.compress(pdf_text.encode("utf-8")))
+                text_cache_tmp_path.replace(text_cache_path)
+                self._evict_text_cache()
+            except OSError as error:
+                logger.warning("Could not write PDF text cache %s: %s", text_cache_path, error)
 
         return pdf_text
 
+    def _get_text_cache_path(self, item_data: Dict) -> Path | None:
+        """Returns the text cache file of an attachment, keyed by its key and the version of its file."""
+
+        if self.text_cache_dir is None:
+            return None
+        # Linked files have no md5, their file may be edited on disk without any change in Zotero
+        if not item_data.get("md5"):
+            return None
+        # The md5/mtime of the stored file change whenever the attachment file is replaced
+        file_version = "|".join(str(item_data.get(field, "")) for field in ("key", "md5", "mtime", "dateModified"))
+        cache_key = hashlib.sha1(file_version.encode("utf-8")).hexdigest()
+        return self.text_cache_dir / f"{cache_key}.txt.gz"
+
+    def _evict_text_cache(self):
+        """Deletes the least recently used cached texts beyond PDF_TEXT_CACHE_MAX_FILES."""
+
+        text_cache_paths = list(self.text_cache_dir.glob("*.txt.gz")) # type: ignore
+        if len(text_cache_paths) <= PDF_TEXT_CACHE_MAX_FILES:
+            return
+        text_cache_paths.sort(key=lambda text_cache_path: text_cache_path.stat().st_mtime)
+        for text_cache_path in text_cache_paths[:-PDF_TEXT_CACHE_MAX_FILES]:
+            text_cache_path.unlink(missing_ok=True)
+        logger.info("Evicted %d cached PDF text(s)", len(text_cache_paths) - PDF_TEXT_CACHE_MAX_FILES)
+
+    def _extract_text(self, item_data: Dict) -> str:
+        """Downloads a PDF attachment and extracts its text."""
+
+        pdf_bytes = self.pyzotero_client.worker_client().file(item_data.get("key")) #type: ignore
+
+        with _import_fitz().open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+            return _get_pdf_text(pdf_document)
+
 class PyzoteroParser:
     """Parses Zotero items metadata and content."""
 
     def __init__(self, pyzotero_client: PyzoteroClient,
-                 strategy: PyzoteroParsingStrategy | None = None):
+                 strategy: PyzoteroParsingStrategy | None = None,
+                 cache_dir: Path | None = None,
+                 pdf_text_max_chars: int | None = None):
         """"""
         self.pyzotero_client = pyzotero_client
         self._strategy = strategy
+        self.cache_dir = cache_dir
+        # The strategies hold no per-item state, so one instance of each is shared by all items
+        self._strategies_by_item_type: Dict[str, PyzoteroParsingStrategy] = {
+            "note": NotePyzoteroParsingStrategy()
+        }
+        self._strategies_by_content_type: Dict[str, PyzoteroParsingStrategy] = {
+            "application/pdf": PDFAttachmentPyzoteroParsingStrategy(self.pyzotero_client, self.cache_dir,
+                                                                    pdf_text_max_chars)
+        }
+        self._default_strategy = ItemPyzoteroParsingStrategy()
+        # Parent items and collections are shared by many found items, so cache them by key
+        self._item_cache: Dict[str, Dict] = {}
+        # Collection key -> (name, parent collection key), the parent key is False for top collections
+        self._collection_records: Dict[str, Tuple[str, str | bool]] = {}
+        self._collection_versions: Dict[str, int] = {}
+        # All collections of the library are loaded at once on first use, see _ensure_collections_loaded
+        self._collections_loaded = False
+        self._collections_changed = False
+        self._collections_lock = threading.Lock()
+        # The collections are kept on disk between server runs and written back on exit
+        self.collections_cache_path = cache_dir / \
+            f"collections_{pyzotero_client.library_type}_{pyzotero_client.library_id}.json" if cache_dir else None
+        if self.collections_cache_path:
+            self._load_collections_cache()
+            atexit.register(self.save_collections_cache)
+        # Collection key -> names of the collection and its parents, from the top collection down
+        self._collection_chain_cache: Dict[str, List[str]] = {}
+        # Collection key -> formatted result of get_item_collections_names, shared by the items of a search
+        self._collection_names_cache: Dict[str, Tuple[List[str], int]] = {}
+        # Kept for the lifetime of the parser, so the worker clients and their connections are reused
+        self._executor = ThreadPoolExecutor(max_workers=METADATA_MAX_WORKERS,
+                                            thread_name_prefix="zotero-metadata")
 
     def auto_set_strategy(self, item_type: str | None, item_content_type: str | None,
                           item_data: Dict, item_parent_type: str | None = None,
                           item_parent_content_type: str | None = None, item_parent_data: Dict | None = None):
         """Automatically sets the parsing strategy based on item type and content type."""
+        self.set_strategy(self._select_strategy(item_type, item_content_type))
 
-        if item_type == "note":
-            self.set_strategy(NotePyzoteroParsingStrategy())
-        elif item_content_type == "application/pdf":
-            self.set_strategy(PDFAttachmentPyzoteroParsingStrategy(self.pyzotero_client))
-        else:
-            self.set_strategy(ItemPyzoteroParsingStrategy())
+    def _select_strategy(self, item_type: str | None, item_content_type: str | None) -> PyzoteroParsingStrategy:
+        """Returns the parsing strategy for an item type and content type, the item type takes precedence."""
+
+        return self._strategies_by_item_type.get(item_type) \
+            or self._strategies_by_content_type.get(item_content_type, self._default_strategy) # type: ignore
 
     def set_strategy(self, strategy: PyzoteroParsingStrategy):
         """Sets the parsing strategy for the parser."""
         self._strategy = strategy
 
-    def parse_items_metadata(self, found_items: List) -> List:
-        """Parses important metadata of a list of Zotero items."""
-
-        _assert_list(found_items)
-        parsed_items_metadata = [self._parse_item_metadata(found_item) for found_item in found_items]
+    def parse_items_metadata(self, found_items: List) -> Iterator[Dict]:
+        """Parses important metadata of a list of Zotero items, returned in the order of the found items."""
 
-        return parsed_items_metadata
+        _assert_items(found_items)
+        self._prefetch_items_metadata(found_items)
+        # Items left out by the prefetch are looked up per key, these requests run concurrently
+        return self._executor.map(self._parse_item_metadata, found_items)
 
     def _parse_item_metadata(self, found_item: Dict) -> Dict:
-        """Parses important metadata of a single Zotero item."""
+        """Parses important metadata of a single Zotero item, validated by parse_items_metadata."""
 
-        _assert_dict(found_item)
         item_key = found_item.get("key")
-        item_data = found_item.get("data", {})
-        _assert_dict(item_data)
+        item_data = found_item["data"]
 
         item_type = item_data.get("itemType")
         item_content_type = item_data.get("contentType")
@@ -165,18 +373,16 @@ class PyzoteroParser:
         # Check if item has a parentItem
         item_parent_key = item_data.get("parentItem")
         item_parent_data = self.get_parent_item_data(item_parent_key)
-        item_parent_type = item_parent_data.get("itemType")
-        item_parent_content_type = item_parent_data.get("contentType")
         item_collection_keys = item_collection_keys if isinstance(item_collection_keys, list) \
                                                     else item_parent_data.get("collections")
 
+        # Standalone items without collections have neither own nor parent collections
         item_collection_names = [self.get_item_collections_names(item_collection_key)[0]
-                                    for item_collection_key in item_collection_keys]  #type: ignore
+                                    for item_collection_key in item_collection_keys or ()]
 
-        self.auto_set_strategy(item_type, item_content_type, item_data,
-                               item_parent_type, item_parent_content_type, item_parent_data)
-
-        item_title, item_parent_title = self._strategy.parse_title(item_data, item_parent_data) #type: ignore
+        # Local instead of self._strategy, items are parsed by several threads at once
+        strategy = self._select_strategy(item_type, item_content_type)
+        item_title, item_parent_title = strategy.parse_title(item_data, item_parent_data)
 
         item_metadata = {
             "itemKey": item_key,
@@ -187,29 +393,28 @@ class PyzoteroParser:
         }
         return item_metadata
 
-    def parse_items_content(self, retrieved_items: List) -> List:
-        """Parses the content of a list of retrieved Zotero items."""
-
-        _assert_list(retrieved_items)
-        parsed_items_content = [self._parse_item_content(retrieved_item) for retrieved_item in retrieved_items]
+    def parse_items_content(self, retrieved_items: List) -> Iterator[Dict]:
+        """Parses the content of a list of retrieved Zotero items, one item at a time.
 
-        return parsed_items_content
+        The items are validated on call, their content is parsed lazily while iterating, so consumers
+        which process the items one by one only hold the content of a single item, e.g. the text of one PDF, at once.
+        """
 
+        _assert_items(retrieved_items)
+        return map(self._parse_item_content, retrieved_items)
 
     def _parse_item_content(self, retrieved_item: Dict) -> Dict:
-        """Parses the content of a single retrieved Zotero item."""
+        """Parses the content of a single retrieved Zotero item, validated by parse_items_content."""
 
-        _assert_dict(retrieved_item)
         item_key = retrieved_item.get("key")
-        item_data = retrieved_item.get("data", {})
-        _assert_dict(item_data)
+        item_data = retrieved_item["data"]
         item_type = item_data.get("itemType")
         item_content_type = item_data.get("contentType")
 
-        self.auto_set_strategy(item_type, item_content_type, item_data)
-
-        item_title, _ = self._strategy.parse_title(item_data, {}) # type: ignore
-        item_content = self._strategy.parse_content(item_data) # type: ignore
+        # Local instead of self._strategy, items may be parsed by several tool calls at once
+        strategy = self._select_strategy(item_type, item_content_type)
+        item_title, _ = strategy.parse_title(item_data, {})
+        item_content = strategy.parse_content(item_data)
 
         return {
             "itemKey": item_key,
@@ -217,62 +422,252 @@ class PyzoteroParser:
             "itemContent": item_content
         }
 
+    def _prefetch_items_metadata(self, found_items: List):
+        """Fills the item and collection caches for a list of found items with batched requests.
+
+        Parent items which the bulk requests do not return are fetched concurrently one by one,
+        so parsing the found items afterwards only reads from the caches.
+        """
+
+        found_items_data = [found_item["data"] for found_item in found_items]
+
+        item_parent_keys = {item_data.get("parentItem") for item_data in found_items_data} - {None}
+        pyzotero_client = self.pyzotero_client.worker_client()
+        # refresh may swap in a new cache meanwhile, the parsing then fetches the parent items it is missing
+        item_cache = self._item_cache
+        item_cache.update(pyzotero_client.get_items_by_keys(item_parent_keys - item_cache.keys()))
+        missing_item_parent_keys = list(item_parent_keys - item_cache.keys())
+        item_cache.update(zip(missing_item_parent_keys,
+                              self._executor.map(self._fetch_item, missing_item_parent_keys)))
+
+        self._ensure_collections_loaded()
+
+        logger.info("Prefetched metadata of %d found item(s): %d parent item(s), %d collection(s) cached",
+                    len(found_items), len(self._item_cache), len(self._collection_records))
+
+    def _ensure_collections_loaded(self):
+        """Loads all collections of the library, on first use or after refresh.
+
+        Without known collections all of them are loaded with one paginated request. Otherwise only the
+        versions of the collections are requested and the new or changed collections are fetched.
+        Resolving the parents of any collection is a dict walk afterwards. Collections created later
+        are still found by the per-key lookup in _get_collection_record.
+        """
+
+        if self._collections_loaded:
+            return
+        with self._collections_lock:
+            if self._collections_loaded:
+                return
+            pyzotero_client = self.pyzotero_client.worker_client()
+            removed_collection_keys: List[str] = []
+            if self._collection_versions:
+                library_versions: Dict = pyzotero_client.collection_versions() # type: ignore
+                _assert_dict(library_versions)
+                changed_collection_keys = [collection_key for collection_key, version in library_versions.items()
+                                           if self._collection_versions.get(collection_key) != version]
+                removed_collection_keys = list(self._collection_versions.keys() - library_versions.keys())
+                collections = list(pyzotero_client.get_collections_by_keys(changed_collection_keys).values())
+            else:
+                collections = pyzotero_client.everything(pyzotero_client.collections())
+                _assert_list(collections)
+            if removed_collection_keys:
+                # Replaced instead of changed in place, searches may read the collections meanwhile
+                removed_collection_keys_set = set(removed_collection_keys)
+                self._collection_records = {collection_key: collection_record for collection_key, collection_record
+                                            in self._collection_records.items()
+                                            if collection_key not in removed_collection_keys_set}
+                self._collection_versions = {collection_key: version for collection_key, version
+                                             in self._collection_versions.items()
+                                             if collection_key not in removed_collection_keys_set}
+                self._collections_changed = True
+            for collection in collections:
+                self._add_collection(collection)
+            self._collections_loaded = True
+            logger.info("Loaded %d and removed %d collection(s) of the library, %d collection(s) known",
+                        len(collections), len(removed_collection_keys), len(self._collection_records))
+
+    def _add_collection(self, collection: Dict) -> Tuple[str, str | bool]:
+        """Adds the record and version of a fetched collection to the collection caches, holding the lock."""
+        collection_record = _collection_record(collection)
+        self._collection_records[collection["key"]] = collection_record
+        self._collection_versions[collection["key"]] = collection.get("version") # type: ignore
+        self._collections_changed = True
+        return collection_record
+
+    def _load_collections_cache(self):
+        """Reads the collections kept on disk by a previous server run."""
+
+        try:
+            collections_cache = json.loads(self.collections_cache_path.read_text(encoding="utf-8")) # type: ignore
+            _assert_dict(collections_cache)
+            collection_records, collection_versions = collections_cache["records"], collections_cache["versions"]
+            if not isinstance(collection_records, dict) or not isinstance(collection_versions, dict):
+                raise TypeError("The collection records and versions need to be of type dict")
+            self._collection_records = {collection_key: tuple(collection_record) # type: ignore
+                                        for collection_key, collection_record in collection_records.items()}
+            self._collection_versions = collection_versions
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, KeyError) as error:
+            logger.warning("Ignoring unreadable collections cache %s: %s", self.collections_cache_path, error)
+            self._collection_records, self._collection_versions = {}, {}
+            return
+        logger.info("Read %d cached collection(s) from %s", len(self._collection_records), self.collections_cache_path)
+
+    def save_collections_cache(self):
+        """Writes the known collections to disk, if they changed since they were read."""
+
+        if self.collections_cache_path is None or not self._collections_changed:
+            return
+        with self._collections_lock:
+            collections_cache = {"records": self._collection_records, "versions": self._collection_versions}
+            try:
+                self.collections_cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a temporary file first, so a crash never leaves a truncated cache
+                collections_cache_tmp_path = self.collections_cache_path.with_suffix(f".{os.getpid()}.tmp")
+                collections_cache_tmp_path.write_text(json.dumps(collections_cache), encoding="utf-8")
+                collections_cache_tmp_path.replace(self.collections_cache_path)
+                self._collections_changed = False
+            except OSError as error:
+                logger.warning("Could not write collections cache %s: %s", self.collections_cache_path, error)
+
+    def refresh(self):
+        """Drops all cached items, the known collections are checked against the library on next use.
+
+        The caches are replaced by new ones instead of cleared, searches running meanwhile keep reading the old ones.
+        """
+
+        with self._collections_lock:
+            self._item_cache = {}
+            self._collection_chain_cache = {}
+            self._collection_names_cache = {}
+            self._collections_loaded = False
+
     def get_parent_item_data(self, item_parent_key: str | None) -> Dict:
         """Retrieves and returns the data of a parent Zotero item."""
 
         if not item_parent_key:
             return {}
-        item_parent : Dict = self.pyzotero_client.item(item_parent_key) # type: ignore
-        logger.info("Item has a parent item with key: %s", item_parent_key)
+        item_parent = self._item_cache.get(item_parent_key)
+        if item_parent is None:
+            item_parent = self._fetch_item(item_parent_key)
+            self._item_cache[item_parent_key] = item_parent
+        logger.debug("Item has a parent item with key: %s", item_parent_key)
         item_parent_data = item_parent.get("data", {})
 
         return item_parent_data
 
-    def get_item_collections_names(self, collection_key: str | Dict, depth: int = 0) -> Tuple[List[str],int]:
-        """Recursively retrieves the names of a collection and its parent collections."""
-
-        if depth > 100:
-            raise RecursionError("Created an infinite recursion!")
+    def _fetch_item(self, item_key: str) -> Dict:
+        """Fetches a single Zotero item with the client of the calling thread."""
+        return self.pyzotero_client.worker_client().item(item_key) # type: ignore
 
-        if isinstance(collection_key, dict):
-            collection_key = list(collection_key.values()) # type: ignore
+    def _get_collection_record(self, collection_key: str) -> Tuple[str, str | bool]:
+        """Returns the name and parent collection key of a collection, fetched from the library only once per key."""
 
-        logger.info("Depth %d: Processing collection key: %s", depth, collection_key)
-        collection: Dict = self.pyzotero_client.collection(collection_key) # type: ignore
-        _assert_dict(collection)
-        collection_data = collection.get("data", {}) # type: ignore
-        _assert_dict(collection_data)
-        collection_name = collection_data.get("name")
-        parent_collection_key = collection_data.get("parentCollection")
+        collection_record = self._collection_records.get(collection_key)
+        if collection_record is None:
+            collection = self.pyzotero_client.worker_client().collection(collection_key)
+            with self._collections_lock:
+                collection_record = self._add_collection(collection) # type: ignore
+        return collection_record
 
-        if not parent_collection_key:
-            total_depth = depth
-            return [f"Collection depth=0: {collection_name}"], total_depth
+    def get_item_collections_names(self, collection_key: str | Dict) -> Tuple[List[str],int]:
+        """Retrieves the names of a collection and its parent collections, ordered from the top collection down."""
 
-        parent_collections, total_depth = self.get_item_collections_names(parent_collection_key, depth + 1) #type: ignore
-        # Calculate reversed depth (0 at top, increasing as we go down)
-        reversed_depth = total_depth - depth
-        collection_entry = f"Collection depth={reversed_depth}: {collection_name}"
+        self._ensure_collections_loaded()
 
-        return parent_collections + [collection_entry], total_depth
+        if isinstance(collection_key, dict):
+            collection_key = list(collection_key.values()) # type: ignore
 
+        # Read once, refresh may replace the caches while the chain is resolved
+        collection_names_cache = self._collection_names_cache
+        collection_chain_cache = self._collection_chain_cache
+        collection_names = collection_names_cache.get(collection_key) # type: ignore
+        if collection_names is not None:
+            return collection_names
+
+        # Walk up until the top collection or a collection whose chain is already known, logged once per chain
+        walked_keys: List[str] = []
+        walked_names: List[str] = []
+        key = collection_key
+        chain_names = collection_chain_cache.get(key) if key else [] # type: ignore
+        while chain_names is None:
+            if len(walked_keys) > 100:
+                raise RecursionError("Created an infinite recursion!")
+            collection_name, parent_key = self._get_collection_record(key) # type: ignore
+            walked_keys.append(key) # type: ignore
+            walked_names.append(collection_name)
+            key = parent_key
+            chain_names = collection_chain_cache.get(key) if key else [] # type: ignore
+
+        # Memoize the chain of every collection passed on the way up
+        for walked_key, walked_name in zip(reversed(walked_keys), reversed(walked_names)):
+            chain_names = chain_names + [walked_name]
+            collection_chain_cache[walked_key] = chain_names
+
+        collection_names = [f"Collection depth={chain_depth}: {chain_name}"
+                            for chain_depth, chain_name in enumerate(chain_names)], len(chain_names) - 1
+        collection_names_cache[collection_key] = collection_names # type: ignore
+        logger.debug("Resolved collection key %s with %d uncached parent(s)", collection_key, len(walked_keys))
+        return collection_names
+
+
+def _collection_record(collection: Dict) -> Tuple[str, str | bool]:
+    """Returns the name and parent collection key of a Zotero collection."""
+    _assert_dict(collection)
+    collection_data = collection.get("data", {})
+    _assert_dict(collection_data)
+    return collection_data.get("name"), collection_data.get("parentCollection") # type: ignore
+
+
+def _get_note_html_parser() -> lxml_html.HTMLParser:
+    """Returns the note HTML parser of the calling thread, comments and blank text are dropped while parsing."""
+    note_html_parser = getattr(_note_html_parsers, "parser", None)
+    if note_html_parser is None:
+        note_html_parser = lxml_html.HTMLParser(remove_comments=True, remove_blank_text=True)
+        _note_html_parsers.parser = note_html_parser
+    return note_html_parser
+
+def _get_pdf_text(pdf_document: Any) -> str:
+    """Extracts and joins the text of all pages of an open PDF document."""
+    fitz = _import_fitz()
+    # Default flags of get_text("text"), spelled out to make sure images are never decoded during text extraction
+    text_flags = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_IMAGES
+    # Join once at the end, repeated += would copy the growing text for every page
+    return "".join([page.get_text("text", flags=text_flags)
+                    for page in pdf_document])
+
+def _import_fitz():
+    """Imports PyMuPDF on first use, it takes longer to import than all other modules and only PDFs need it."""
+    import fitz # pylint: disable=import-outside-toplevel
+    return fitz
 
 def _assert_list(instance: Any):
     """Asserts that the input is a list."""
-    if not isinstance(instance, list):
-        raise TypeError(f"The found items need to be a of type: {type([])} \
-                            but it is of type: {type(instance)}")
+    if type(instance) is not list: # pylint: disable=unidiomatic-typecheck
+        raise TypeError(_LIST_TYPE_ERROR.format(type(instance)))
+
+def _assert_items(instance: Any):
+    """Asserts once per batch that the input is a list of Zotero items with data."""
+    _assert_list(instance)
+    for item in instance:
+        # Only items which fail the cheap check go through _assert_dict, which raises the matching error
+        if type(item) is not dict or not item: # pylint: disable=unidiomatic-typecheck
+            _assert_dict(item)
+        item_data = item.get("data", {})
+        if type(item_data) is not dict or not item_data: # pylint: disable=unidiomatic-typecheck
+            _assert_dict(item_data)
 
 def _assert_dict(instance: Any):
-    """Asserts that the input is a list."""
-    if not isinstance(instance, dict):
-        raise TypeError(f"The found item need to be a of type {type({})}, \
-                        but is of type: {type(instance)}.")
+    """Asserts that the input is a non-empty dict."""
+    if type(instance) is not dict: # pylint: disable=unidiomatic-typecheck
+        raise TypeError(_DICT_TYPE_ERROR.format(type(instance)))
     if not instance:
         raise ValueError(f"Dict shouldn't be empty: {instance}")
 
-def _assert_tag(instance: Any):
-    """Asserts that the input is a BeautifulSoup Tag object."""
-    if not isinstance(instance, Tag):
-        raise TypeError(f"The found item need to be a of type {type(Tag)}, \
+def _assert_html_element(instance: Any):
+    """Asserts that the input is a lxml HtmlElement object."""
+    if not isinstance(instance, lxml_html.HtmlElement):
+        raise TypeError(f"The found item need to be a of type {lxml_html.HtmlElement}, \
                                 but is of type: {type(instance)}.")
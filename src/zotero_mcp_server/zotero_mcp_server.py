@@ -2,6 +2,8 @@
 A simple MCP server which allows querying PDFs and Notes from Zotero.
 """
 from typing import Tuple, List, Dict
+from pathlib import Path
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -15,17 +17,24 @@ from .pyzotero_wrapper import PyzoteroClient, PyzoteroParser
 load_dotenv()
 LIBRARY_ID = os.getenv("LIBRARY_ID")
 LIBRARY_TYPE = os.getenv("LIBRARY_TYPE")
+# Set ZOTERO_MCP_DISABLE_CACHE=1 to always read collections and PDF texts from Zotero, e.g. during development
+CACHE_DIR = None if os.getenv("ZOTERO_MCP_DISABLE_CACHE") == "1" \
+    else Path(os.getenv("ZOTERO_MCP_CACHE_DIR", Path.home() / ".cache" / "zotero-mcp"))
+# Optional maximum number of characters returned per PDF, so a single huge PDF can't fill the whole response
+PDF_TEXT_MAX_CHARS = int(os.getenv("ZOTERO_MCP_PDF_TEXT_MAX_CHARS", "0")) or None
 
 pyzotero_client = PyzoteroClient(library_id=LIBRARY_ID,
                                     library_type=LIBRARY_TYPE,
                                     local=True)
-pyzotero_parser = PyzoteroParser(pyzotero_client=pyzotero_client)
+pyzotero_parser = PyzoteroParser(pyzotero_client=pyzotero_client,
+                                 cache_dir=CACHE_DIR,
+                                 pdf_text_max_chars=PDF_TEXT_MAX_CHARS)
 
 mcp = FastMCP(name="ZoteroMCPServer", version="0.1.0")
 
 
 @mcp.tool()
-def search_zotero_library(limit: int, query: str) -> Tuple[str, List]:
+async def search_zotero_library(limit: int, query: str) -> Tuple[str, List]:
     """
     Search the Zotero library for items matching the provided query.
     
@@ -46,22 +55,15 @@ def search_zotero_library(limit: int, query: str) -> Tuple[str, List]:
             and "itemCollectionNames".
     
     Example:
-        >>> status, results = search_zotero_library(10, "machine learning")
+        >>> status, results = await search_zotero_library(10, "machine learning")
         >>> print(status)
         "Search results: 5 items found"
     """
-
-    found_items = pyzotero_client.query_library(limit=limit, query=query)
-    if not found_items:
-        return "Search results: 0 items found - no items match the search query" , found_items
-
-    parsed_items_metadata = pyzotero_parser.parse_items_metadata(found_items=found_items)
-
-    return f"Search results: {len(parsed_items_metadata)} item{'s' if len(parsed_items_metadata) > 1 else ''} found", \
-            parsed_items_metadata
+    # The blocking Zotero requests run in a worker thread, so the event loop can serve other tool calls
+    return await asyncio.to_thread(_search_zotero_library, limit, query)
 
 @mcp.tool()
-def retrieve_zotero_items_content(item_keys: List[str]) -> List[Dict[str, str]]:
+async def retrieve_zotero_items_content(item_keys: List[str]) -> List[Dict[str, str]]:
     """
     Retrieve and parse the content of specific Zotero items by their keys.
     
@@ -88,13 +90,32 @@ def retrieve_zotero_items_content(item_keys: List[str]) -> List[Dict[str, str]]:
         - The parsing strategy is automatically determined based on the item type and content type
     
     Example:
-        >>> item_contents = retrieve_zotero_item_content(["ABC123", "DEF456"])
+        >>> item_contents = await retrieve_zotero_item_content(["ABC123", "DEF456"])
         >>> print(f"Retrieved {len(item_contents)} items")
         "Retrieved 2 items"
     """
-    retrieved_items = pyzotero_client.retrieve_items(item_keys)
+    return await asyncio.to_thread(_retrieve_zotero_items_content, item_keys)
+
+def _search_zotero_library(limit: int, query: str) -> Tuple[str, List]:
+    """Blocking implementation of search_zotero_library, runs in a worker thread."""
+
+    # Collections and parent items may have changed in Zotero since the last search
+    pyzotero_parser.refresh()
+    found_items = pyzotero_client.worker_client().query_library(limit=limit, query=query)
+    if not found_items:
+        return "Search results: 0 items found - no items match the search query" , found_items
+
+    parsed_items_metadata = list(pyzotero_parser.parse_items_metadata(found_items=found_items))
+
+    return f"Search results: {len(parsed_items_metadata)} item{'s' if len(parsed_items_metadata) > 1 else ''} found", \
+            parsed_items_metadata
+
+def _retrieve_zotero_items_content(item_keys: List[str]) -> List[Dict[str, str]]:
+    """Blocking implementation of retrieve_zotero_items_content, runs in a worker thread."""
+
+    retrieved_items = pyzotero_client.worker_client().retrieve_items(item_keys)
 
-    parsed_items_content = pyzotero_parser.parse_items_content(retrieved_items)
+    parsed_items_content = list(pyzotero_parser.parse_items_content(retrieved_items))
 
     return parsed_items_content
 
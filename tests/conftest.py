@@ -0,0 +1,113 @@
+"""Shared fixtures with the test data of the Zotero MCP Server tests"""
+
+import functools
+import glob
+import mmap
+import os
+import re
+from pathlib import Path
+from types import MappingProxyType
+
+import orjson
+import pytest
+
+# The tests import the server module, which must neither read nor write the cache of the developer,
+# so PDF texts are always extracted. Set before any test module imports the server.
+os.environ["ZOTERO_MCP_DISABLE_CACHE"] = "1"
+# Anchored on this file, so the test data is found whatever the working directory of pytest is
+_TESTS_DATA_DIR = Path(__file__).parent / "tests_data"
+# Test data files from this size on are marked as slow
+_SLOW_TEST_DATA_SIZE = 256 * 1024
+_LIMIT_RE = re.compile(r"limit-(\d+)")
+_QUERY_RE = re.compile(r"query-(.*?)\.json")
+
+
+def _patch_query_library_param(tests_data_path: str):
+    """Returns the pytest parameter (path, limit, query) of a patched query_library file, parsed from its name."""
+    tests_data_filename = os.path.basename(tests_data_path)
+    limit = int(_LIMIT_RE.search(tests_data_filename).group(1)) #type: ignore
+    query = _QUERY_RE.search(tests_data_filename).group(1) #type: ignore
+    marks = pytest.mark.slow if os.path.getsize(tests_data_path) >= _SLOW_TEST_DATA_SIZE else ()
+    return pytest.param((tests_data_path, limit, query), id=query, marks=marks)
+
+# Found items of the patched query_library responses, limit and query are parsed once at import
+# Only the file paths are collected, the test data is loaded by the fixtures when the tests run, never at collection
+_PATCH_QUERY_LIBRARY_GLOB = str(_TESTS_DATA_DIR / "patch_query_library_response_limit-*_query-*.json")
+_PATCH_QUERY_LIBRARY_PARAMS = [_patch_query_library_param(tests_data_path) for tests_data_path
+                               in sorted(glob.glob(_PATCH_QUERY_LIBRARY_GLOB))]
+# Without test data the search test would be skipped as an empty parameter set and the run would still pass
+if not _PATCH_QUERY_LIBRARY_PARAMS:
+    raise FileNotFoundError(f"No test data to patch query_library found: {_PATCH_QUERY_LIBRARY_GLOB}")
+
+
+@pytest.fixture(scope="session",
+                name="load_patch_data_query_library_fixture",
+                params=_PATCH_QUERY_LIBRARY_PARAMS
+)
+def load_patch_data_query_library(request):
+    """Load patch data to test querying the library, once per session, the data must not be mutated by the tests."""
+    return _load_patch_data_query_library(*request.param)
+
+@pytest.fixture(scope="session",
+                name="load_test_data_retrieve_zotero_items_content_fixture",
+                params=[str(_TESTS_DATA_DIR / "test_data_retrieve_zotero_items_content.json")],
+                ids=["retrieve_zotero_items_content"]
+                )
+def load_test_data_retrieve_zotero_items_content(request):
+    """Load test data for retrieving item content, once per session."""
+    tests_data_path = request.param
+    test_data = _read_json(tests_data_path)
+
+    item_keys = test_data.get("item_keys")
+    test_retrieved_items_content =  test_data.get("retrieved_items_content")
+
+    return item_keys, test_retrieved_items_content
+
+@pytest.fixture(scope="session",
+                name="load_test_data_search_zotero_library_orphan_note_fixture")
+def load_test_data_search_zotero_library_orphan_note():
+    """Load test data with an orphan note followed by a note in a collection, once per session."""
+    return _read_json(str(_TESTS_DATA_DIR / "test_data_search_zotero_library_orphan_note.json"))
+
+def _load_patch_data_query_library(tests_data_path: str, limit: int, query: str):
+    """Returns the query_library inputs, the found items to patch, the expected metadata and the expected status
+    message of a test data file."""
+    test_data = _read_json(tests_data_path)
+
+    inputs_query_library = {"limit": limit, "query": query}
+    patch_found_items = test_data.get("found_items")
+    test_parsed_items_metadata =  test_data.get("parsed_items_metadata")
+    # Same rule as the server, which only reports no matching items if query_library found none
+    if not patch_found_items:
+        test_status_message = "Search results: 0 items found - no items match the search query"
+    else:
+        num_items = len(test_parsed_items_metadata) # type: ignore
+        test_status_message = f"Search results: {num_items} item{'s' if num_items > 1 else ''} found"
+
+    return inputs_query_library, patch_found_items, test_parsed_items_metadata, test_status_message
+
+@functools.lru_cache(maxsize=None)
+def _read_json(filename: str) -> MappingProxyType:
+    """Reads data from a JSON file and returns it as a Python dictionary with a read-only top level.
+
+    Each file is decoded once per process and shared by all tests. Only the top level is read-only,
+    the nested lists and dicts are plain mutable objects, which the tests must not mutate.
+    Every pytest-xdist worker decodes only the files of its tests.
+    A missing or invalid file raises, so the tests using it error instead of failing on empty data.
+
+    Args:
+        filename (str): The name of the JSON file to read.
+
+    Returns:
+        MappingProxyType: A Python dictionary with a read-only top level representing the data from the JSON file.
+    """
+    return MappingProxyType(_decode_json(filename))
+
+def _decode_json(filename: str) -> dict:
+    """Decodes a JSON file, small files are read directly, larger ones are decoded straight from the mapped file."""
+    with open(filename, "rb") as json_file:
+        if os.fstat(json_file.fileno()).st_size < mmap.PAGESIZE:
+            return orjson.loads(json_file.read()) # pylint: disable=no-member
+        with mmap.mmap(json_file.fileno(), 0, access=mmap.ACCESS_READ) as json_map, \
+                memoryview(json_map) as json_view:
+            return orjson.loads(json_view) # pylint: disable=no-member
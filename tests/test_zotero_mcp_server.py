@@ -1,11 +1,12 @@
 """Tests for the Zotero MCP Server implementation"""
 
-import logging
+import asyncio
 import json
-import re
+import logging
 
 import pytest
 
+from zotero_mcp_server.pyzotero_wrapper import PyzoteroClient, PyzoteroParser
 from zotero_mcp_server.zotero_mcp_server import search_zotero_library, retrieve_zotero_items_content
 
 
@@ -15,102 +16,132 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 test_logger = logging.getLogger(__name__)
+# Collections cache of PyzoteroClient(0, "user"), pyzotero names the library type "users"
+_COLLECTIONS_CACHE_FILENAME = "collections_users_0.json"
 
 
-@pytest.fixture(scope="function",
-                name="load_patch_data_query_library_fixture",
-                params=["./tests/tests_data/patch_query_library_response_limit-10000_query-04 Bridge the gap from current state to ideal state.json",
-                        "./tests/tests_data/patch_query_library_response_limit-10000_query-Intelligence.json",
-                        "./tests/tests_data/patch_query_library_response_limit-10000_query-OWASP.json",
-                        "./tests/tests_data/patch_query_library_response_limit-10000_query-Rindfleischetikettierungsüberwachungsaufgabenübertragungsgesetz.json",
-                        "./tests/tests_data/patch_query_library_response_limit-10000_query-Snyk.json"
-                        ]
-)
-def load_patch_data_query_library(request):
-    """Load patch data to test querying the library"""
-    tests_data_path = request.param
-    test_data = _read_json(tests_data_path)
-
-    inputs_query_library = {"limit": int(re.search(r"limit-(\d+)", tests_data_path).group(1)), #type: ignore
-                            "query": re.search(r"query-(.*?)\.json", tests_data_path).group(1)} #type: ignore
-    patch_found_items = test_data.get("found_items")
-    test_parsed_items_metadata =  test_data.get("parsed_items_metadata")
-
-    return inputs_query_library, patch_found_items, test_parsed_items_metadata
-
 @pytest.fixture(scope="function",
                 name="patch_query_library_fixture")
 def patch_query_library(monkeypatch, load_patch_data_query_library_fixture):
-    """Mocks the PyzoteroClient.query_library method."""
-    inputs_query_library, patch_found_items, test_parsed_items_metadata = load_patch_data_query_library_fixture
+    """Mocks the PyzoteroClient.query_library method to return the found items of the test data."""
+    _, patch_found_items, _, _ = load_patch_data_query_library_fixture
 
     monkeypatch.setattr(
-        "zotero_mcp_server.pyzotero_wrapper.PyzoteroClient.query_library",
+        PyzoteroClient, "query_library",
         lambda self, limit, query: patch_found_items
     )
-    return inputs_query_library, patch_found_items, test_parsed_items_metadata
+    return load_patch_data_query_library_fixture
 
 def test_search_zotero_library(patch_query_library_fixture) -> None:
     """Tests the search_zotero_library function."""
-    #test_logger.info(patch_query_library_fixture[0])
-    inputs_query_library, patch_found_items, expected_parsed_items_metadata = patch_query_library_fixture
-    limit = inputs_query_library["limit"]
-    test_logger.info(limit)
-    query = inputs_query_library["query"]
-
-    status_message, parsed_items_metadata = search_zotero_library(limit, query)
-
-    if not patch_found_items:
-        expected_status_message = "Search results: 0 items found - no items match the search query"
-    else:
-        expected_status_message = f"Search results: {len(parsed_items_metadata)} item{'s' if len(parsed_items_metadata) > 1 else ''} found"
+    inputs_query_library, _, expected_parsed_items_metadata, expected_status_message = patch_query_library_fixture
+    test_logger.info(inputs_query_library["limit"])
+
+    status_message, parsed_items_metadata = asyncio.run(search_zotero_library(inputs_query_library["limit"],
+                                                                              inputs_query_library["query"]))
+
     assert status_message == expected_status_message, f"Expected '{expected_status_message}', got '{status_message}'"
     assert parsed_items_metadata == expected_parsed_items_metadata, "Parsed metadata does not match expected metadata"
 
-@pytest.fixture(scope="function",
-                name="load_test_data_retrieve_zotero_items_content_fixture",
-                params=["./tests/tests_data/test_data_retrieve_zotero_items_content.json"]
-                )
+def test_search_zotero_library_orphan_note(monkeypatch, load_test_data_search_zotero_library_orphan_note_fixture):
+    """Tests that a note without collections and parent item doesn't stop the parsing of the following items."""
+    test_data = load_test_data_search_zotero_library_orphan_note_fixture
+    collection_records = {collection_key: tuple(collection_record)
+                          for collection_key, collection_record in test_data["collection_records"].items()}
 
-def load_test_data_retrieve_zotero_items_content(request):
-    """Load test data for retrieving item content."""
-    tests_data_path = request.param
-    test_data = _read_json(tests_data_path)
+    monkeypatch.setattr(
+        PyzoteroClient, "query_library",
+        lambda self, limit, query: test_data["found_items"]
+    )
+    monkeypatch.setattr(
+        PyzoteroParser, "_ensure_collections_loaded",
+        lambda self: None
+    )
+    monkeypatch.setattr(
+        PyzoteroParser, "_get_collection_record",
+        lambda self, collection_key: collection_records[collection_key]
+    )
 
-    item_keys = test_data.get("item_keys")
-    test_retrieved_items_content =  test_data.get("retrieved_items_content")
+    status_message, parsed_items_metadata = asyncio.run(search_zotero_library(10, "note"))
 
-    return item_keys, test_retrieved_items_content
+    assert status_message == "Search results: 2 items found"
+    assert parsed_items_metadata == test_data["parsed_items_metadata"], \
+        "Parsed metadata does not match expected metadata"
 
 def test_retrieve_zotero_items_content(load_test_data_retrieve_zotero_items_content_fixture):
     """Tests the retrieve_zotero_items_content function."""
 
     item_keys, test_retrieved_items_content = load_test_data_retrieve_zotero_items_content_fixture
-    retrieved_items_content = retrieve_zotero_items_content(item_keys)
+    retrieved_items_content = asyncio.run(retrieve_zotero_items_content(item_keys))
 
     assert test_retrieved_items_content == retrieved_items_content, "Parsed content does not match expected content"
 
-def _read_json(filename: str) -> dict:
-    """Reads data from a JSON file and returns it as a Python dictionary.
-
-    Args:cl
-        filename (str): The name of the JSON file to read.
-
-    Returns:
-        dict: A Python dictionary representing the data from the JSON file.
-              Returns an empty dictionary if the file is not found or an error occurs.
-    """
-    try:
-        with open(filename, "r", encoding="utf-8") as json_file:
-            data = json.load(json_file)
-        return data
-    except FileNotFoundError:
-        print(f"Error: File '{filename}' not found.")
-        return {}
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from '{filename}'. \
-              The file might be corrupted or not valid JSON.")
-        return {}
-    except IOError as e:
-        print(f"Error reading file '{filename}': {e}")
-        return {}
+def test_collections_cache_save_and_load(monkeypatch, tmp_path):
+    """Tests that the loaded collections are written to the cache and read by the next parser."""
+    monkeypatch.setattr(PyzoteroClient, "collections", lambda self: None)
+    monkeypatch.setattr(PyzoteroClient, "everything",
+                        lambda self, query: [_collection("A", 1, "Top"), _collection("B", 1, "Sub", "A")])
+
+    pyzotero_parser = PyzoteroParser(PyzoteroClient(0, "user"), cache_dir=tmp_path)
+    pyzotero_parser._ensure_collections_loaded() # pylint: disable=protected-access
+    pyzotero_parser.save_collections_cache()
+
+    cached_pyzotero_parser = PyzoteroParser(PyzoteroClient(0, "user"), cache_dir=tmp_path)
+    assert cached_pyzotero_parser._collection_records == {"A": ("Top", False), # pylint: disable=protected-access
+                                                          "B": ("Sub", "A")}
+    assert cached_pyzotero_parser._collection_versions == {"A": 1, "B": 1} # pylint: disable=protected-access
+
+@pytest.mark.parametrize("library_versions,expected_collection_records",
+                         [({"A": 1, "B": 2, "D": 1},
+                           {"A": ("Top", False), "B": ("Renamed", "A"), "D": ("New", False)}),
+                          ({"A": 1, "B": 1},
+                           {"A": ("Top", False), "B": ("Sub", "A")})],
+                         ids=["changed_and_removed", "removed_only"])
+def test_collections_cache_version_diff(monkeypatch, tmp_path, library_versions, expected_collection_records):
+    """Tests that only changed collections are fetched for a cached library and removed ones are dropped."""
+    _write_collections_cache(tmp_path, {"A": ["Top", False], "B": ["Sub", "A"], "C": ["Removed", "A"]},
+                             {"A": 1, "B": 1, "C": 1})
+    library_collections = {"A": _collection("A", 1, "Top"), "B": _collection("B", 2, "Renamed", "A"),
+                           "D": _collection("D", 1, "New")}
+    monkeypatch.setattr(PyzoteroClient, "collection_versions", lambda self: library_versions)
+    monkeypatch.setattr(PyzoteroClient, "get_collections_by_keys",
+                        lambda self, collection_keys: {collection_key: library_collections[collection_key]
+                                                       for collection_key in collection_keys})
+    monkeypatch.setattr(PyzoteroClient, "everything", _fail_everything)
+
+    pyzotero_parser = PyzoteroParser(PyzoteroClient(0, "user"), cache_dir=tmp_path)
+    pyzotero_parser._ensure_collections_loaded() # pylint: disable=protected-access
+    pyzotero_parser.save_collections_cache()
+
+    assert pyzotero_parser._collection_records == expected_collection_records # pylint: disable=protected-access
+    collections_cache = json.loads(pyzotero_parser.collections_cache_path.read_text(encoding="utf-8")) # type: ignore
+    assert collections_cache["records"].keys() == expected_collection_records.keys()
+    assert collections_cache["versions"] == library_versions
+
+@pytest.mark.parametrize("collections_cache_text",
+                         ['{"records": [], "versions": {}}', '{"records": {}, "versions": []}',
+                          '{"records": {"A": 3}, "versions": {}}', '{"records": {}}', "[]", "not json"],
+                         ids=["records_list", "versions_list", "record_int", "no_versions", "list", "invalid_json"])
+def test_collections_cache_unreadable(tmp_path, collections_cache_text):
+    """Tests that an unreadable collections cache is ignored instead of failing the parser."""
+    (tmp_path / _COLLECTIONS_CACHE_FILENAME).write_text(collections_cache_text, encoding="utf-8")
+
+    pyzotero_parser = PyzoteroParser(PyzoteroClient(0, "user"), cache_dir=tmp_path)
+
+    assert pyzotero_parser._collection_records == {} # pylint: disable=protected-access
+    assert pyzotero_parser._collection_versions == {} # pylint: disable=protected-access
+
+
+def _collection(collection_key: str, version: int, name: str, parent_collection_key: str | bool = False) -> dict:
+    """Returns a Zotero collection as returned by the Zotero API."""
+    return {"key": collection_key, "version": version,
+            "data": {"key": collection_key, "name": name, "parentCollection": parent_collection_key}}
+
+def _write_collections_cache(cache_dir, collection_records: dict, collection_versions: dict):
+    """Writes a collections cache of the user library 0 as written by a previous server run."""
+    (cache_dir / _COLLECTIONS_CACHE_FILENAME).write_text(
+        json.dumps({"records": collection_records, "versions": collection_versions}), encoding="utf-8")
+
+def _fail_everything(self, query):
+    """Replaces PyzoteroClient.everything, a cached library must not load all its collections again."""
+    raise AssertionError("All collections were loaded instead of the changed ones")